@@ -1,22 +1,33 @@
 import os
 import time
+import asyncio
+import queue
 import logging
+import logging.handlers
+import re
+import html
+import json
 import sqlite3
-import requests
-import concurrent.futures
-from datetime import datetime, timedelta
+import httpx
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 
 load_dotenv()
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+TELEGRAM_API_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+# Telegram limits how fast a bot can post to one chat; alerts are sent one at a time at least this far apart
+TELEGRAM_MIN_INTERVAL_SECONDS = float(os.getenv("TELEGRAM_MIN_INTERVAL_SECONDS", "1"))
 
 # how long to wait between cycles
 CHECK_INTERVAL_SECONDS = int(os.getenv("CHECK_INTERVAL_SECONDS", "0"))
+# how long to wait before re-checking the users file when it has no handles
+EMPTY_USERS_RETRY_SECONDS = 30
 
 USERS_FILE = os.getenv("USERS_FILE", "users.txt")
+# max number of handles (browser contexts) processed concurrently
 NUM_THREADS = int(os.getenv("NUM_THREADS", "5"))
 
 # DB (for deduplication); should be mounted externally for persistence
@@ -25,191 +36,641 @@ DB_FILENAME = os.getenv("DB_FILENAME", "alerted_posts.db")
 # Only consider tweets within specified days (so we're not inundated when first running the bot)
 TWEET_TIME_THRESHOLD = timedelta(days=7)
 
+# Recycle the shared browser after this many contexts to keep native memory in check
+BROWSER_RECYCLE_AFTER = int(os.getenv("BROWSER_RECYCLE_AFTER", "100"))
+# Optionally attach to an already running Chromium (e.g. http://127.0.0.1:9222) instead of launching one
+BROWSER_CDP_URL = os.getenv("BROWSER_CDP_URL")
+
+# Fetch tweets straight from X's GraphQL API (guest token) and only fall back to the browser on failure
+X_API_ENABLED = os.getenv("X_API_ENABLED", "1") == "1"
+# Public bearer token used by the x.com web client; the GraphQL query IDs rotate, so keep them overridable
+X_BEARER_TOKEN = os.getenv(
+    "X_BEARER_TOKEN",
+    "AAAAAAAAAAAAAAAAAAAAANRILgAAAAAAnNwIzUejRCOuH5E6I8xnZz4puTs%3D1Zv7ttfk8LF81IUq16cHjhLTvJu4FA33AGWWjCpTnA"
+)
+X_USER_BY_SCREEN_NAME_QUERY_ID = os.getenv("X_USER_BY_SCREEN_NAME_QUERY_ID", "G3KGOASz96M-Qu0nwmGXNg")
+X_USER_TWEETS_QUERY_ID = os.getenv("X_USER_TWEETS_QUERY_ID", "V7H0Ap3_Hh2FyS75OCDO3Q")
+# How long to stop trying the API after guest access is refused or rate limited
+X_API_COOLDOWN_SECONDS = int(os.getenv("X_API_COOLDOWN_SECONDS", "300"))
+
 CRYPTO_KEYWORDS = [
     "crypto", "coin", "token", 
     "safemoon", "$", "moonshot"
 ]
+# All keywords in one case-insensitive pattern, so each tweet is scanned once
+CRYPTO_KEYWORDS_RE = re.compile("|".join(re.escape(keyword) for keyword in CRYPTO_KEYWORDS), re.IGNORECASE)
 
 # --- Database functions ---
+# A single long-lived connection; everything runs on the event loop thread
+_CONN = None
+
+def _get_conn():
+    global _CONN
+    if _CONN is None:
+        _CONN = sqlite3.connect(DB_FILENAME)
+        _CONN.execute("PRAGMA journal_mode=WAL")
+        _CONN.execute("PRAGMA synchronous=NORMAL")
+        _CONN.execute("PRAGMA busy_timeout=5000")
+        _CONN.execute("PRAGMA cache_size=-20000")
+        _CONN.execute("PRAGMA temp_store=MEMORY")
+        _CONN.execute("PRAGMA mmap_size=268435456")
+        # Analyze any tables that need it, with a bounded amount of work
+        _CONN.execute("PRAGMA optimize=0x10002")
+    return _CONN
+
+def optimize_db():
+    """Refresh query planner statistics; cheap enough to run after every cycle."""
+    try:
+        _get_conn().execute("PRAGMA optimize")
+    except sqlite3.Error as e:
+        logging.error("Error optimizing database: %s", e)
+
+def checkpoint_db():
+    """Fold the WAL back into the main database file and truncate it."""
+    try:
+        _get_conn().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    except sqlite3.Error as e:
+        logging.error("Error checkpointing database: %s", e)
+
+def close_db():
+    global _CONN
+    if _CONN is not None:
+        _CONN.execute("PRAGMA optimize")
+        _CONN.close()
+        _CONN = None
+
+POSTS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        handle TEXT NOT NULL,
+        link TEXT NOT NULL,
+        alerted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (handle, link)
+    ) WITHOUT ROWID
+"""
+
 def init_db():
-    conn = sqlite3.connect(DB_FILENAME)
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS posts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            handle TEXT NOT NULL,
-            link TEXT NOT NULL,
-            alerted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(handle, link)
+    conn = _get_conn()
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(posts)")]
+    with conn:
+        if "id" in columns:
+            # One-shot migration from the old AUTOINCREMENT rowid table
+            logging.info("Migrating posts table to a WITHOUT ROWID table keyed on (handle, link).")
+            conn.execute(POSTS_SCHEMA.format(table="posts_new"))
+            conn.execute("""
+                INSERT OR IGNORE INTO posts_new (handle, link, alerted_at)
+                SELECT handle, link, alerted_at FROM posts
+            """)
+            conn.execute("DROP TABLE posts")
+            conn.execute("ALTER TABLE posts_new RENAME TO posts")
+        else:
+            conn.execute(POSTS_SCHEMA.format(table="posts"))
+        # Handles and links are stored lowercased; bring rows recorded before that in line
+        conn.execute("""
+            UPDATE OR IGNORE posts SET handle = lower(handle), link = lower(link)
+            WHERE handle != lower(handle) OR link != lower(link)
+        """)
+
+def already_alerted(handle, links):
+    """
+    Return the subset of links for this handle that are already in the database.
+    Handles and links are compared case-insensitively, since X treats screen names that way.
+    """
+    links = list(links)
+    if not links:
+        return set()
+    placeholders = ",".join("?" * len(links))
+    cursor = _get_conn().execute(
+        f"SELECT link FROM posts WHERE handle=? AND link IN ({placeholders})",
+        [handle.lower(), *(link.lower() for link in links)]
+    )
+    stored = {row[0] for row in cursor.fetchall()}
+    return {link for link in links if link.lower() in stored}
+
+def add_alerted(handle, links):
+    """Record all alerted links for a handle in a single transaction."""
+    conn = _get_conn()
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO posts (handle, link) VALUES (?, ?)",
+            [(handle.lower(), link.lower()) for link in links]
         )
-    """)
-    conn.commit()
-    conn.close()
-
-def already_alerted(handle, link):
-    """Return True if the post (handle and link) is already in the database."""
-    conn = sqlite3.connect(DB_FILENAME)
-    cursor = conn.cursor()
-    cursor.execute("SELECT 1 FROM posts WHERE handle=? AND link=?", (handle, link))
-    result = cursor.fetchone()
-    conn.close()
-    return result is not None
-
-def add_alerted(handle, link):
-    conn = sqlite3.connect(DB_FILENAME)
-    cursor = conn.cursor()
-    try:
-        cursor.execute("INSERT INTO posts (handle, link) VALUES (?, ?)", (handle, link))
-        conn.commit()
-    except sqlite3.IntegrityError:
-        # Duplicate entry, do nothing
-        pass
-    finally:
-        conn.close()
 
 # --- Telegram alert functions ---
-def send_telegram_alert(message):
+# Reused across alerts so the connection to api.telegram.org stays open
+_TG_CLIENT = None
+# Serialises sends from every handle so they respect TELEGRAM_MIN_INTERVAL_SECONDS
+_TG_SEND_LOCK = None
+_TG_LAST_SENT = 0.0
+
+def _get_tg_client():
+    global _TG_CLIENT, _TG_SEND_LOCK
+    if _TG_CLIENT is None:
+        _TG_SEND_LOCK = asyncio.Lock()
+        _TG_CLIENT = httpx.AsyncClient(
+            http2=True,
+            timeout=10,
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=4)
+        )
+    return _TG_CLIENT
+
+async def _close_tg_client():
+    global _TG_CLIENT
+    if _TG_CLIENT is not None:
+        await _TG_CLIENT.aclose()
+        _TG_CLIENT = None
+
+async def send_telegram_alert(message):
+    """
+    Send one alert, waiting out Telegram's rate limit if needed.
+    Returns False only if the alert should be retried on a later cycle (rate limiting, 5xx or a network
+    error); other rejections, such as a malformed message or a blocked bot, will never succeed and return True.
+    """
+    global _TG_LAST_SENT
     if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
         logging.error("Telegram bot token or chat ID not set in .env")
-        return
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+        return True
     payload = {
         "chat_id": TELEGRAM_CHAT_ID,
         "text": message,
-        "parse_mode": "Markdown"
+        "parse_mode": "HTML"
     }
-    try:
-        r = requests.post(url, data=payload, timeout=10)
-        if r.status_code != 200:
-            logging.error(f"Failed to send Telegram alert: {r.text}")
-        else:
+    client = _get_tg_client()
+    loop = asyncio.get_running_loop()
+    async with _TG_SEND_LOCK:
+        for _ in range(3):
+            delay = _TG_LAST_SENT + TELEGRAM_MIN_INTERVAL_SECONDS - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                r = await client.post(TELEGRAM_API_URL, data=payload)
+            except Exception as e:
+                logging.error("Exception sending Telegram alert: %s", e)
+                return False
+            finally:
+                _TG_LAST_SENT = loop.time()
+            if r.status_code == 429:
+                # Hold the lock while backing off; the limit applies to every pending alert
+                try:
+                    retry_after = r.json()["parameters"]["retry_after"]
+                except Exception:
+                    retry_after = 5
+                logging.warning("Telegram rate limit hit; retrying in %s seconds.", retry_after)
+                await asyncio.sleep(retry_after)
+                continue
+            if r.status_code >= 500:
+                logging.error("Telegram unavailable, will retry next cycle: %s", r.text)
+                return False
+            if r.status_code != 200:
+                logging.error("Telegram rejected alert, not retrying: %s", r.text)
+                return True
             logging.info("Telegram alert sent successfully.")
-    except Exception as e:
-        logging.error(f"Exception sending Telegram alert: {e}")
+            return True
+    logging.error("Giving up on Telegram alert after repeated rate limiting; will retry next cycle.")
+    return False
 
 # --- Users file management ---
 def load_handles(filename):
-    handles = []
+    """
+    Return the handles in the users file without a leading @, de-duplicated case-insensitively in order.
+    The first spelling of each handle is kept for display; the database lowercases it for dedup.
+    """
+    handles = {}
     try:
         with open(filename, "r") as f:
             for line in f:
-                handle = line.strip()
+                handle = line.strip().lstrip("@")
                 if handle:
-                    handles.append(handle)
+                    handles.setdefault(handle.lower(), handle)
     except Exception as e:
-        logging.error(f"Error reading users file '{filename}': {e}")
-    return handles
+        logging.error("Error reading users file '%s': %s", filename, e)
+    return list(handles.values())
+
+# Cached handles, re-read only when the users file's mtime changes
+_handles = []
+_handles_mtime = None
+
+def current_handles():
+    global _handles, _handles_mtime
+    try:
+        mtime = os.stat(USERS_FILE).st_mtime
+    except OSError as e:
+        logging.error("Error reading users file '%s': %s", USERS_FILE, e)
+        return _handles
+    if mtime != _handles_mtime:
+        _handles = load_handles(USERS_FILE)
+        _handles_mtime = mtime
+    return _handles
+
+# --- Browser management ---
+# One Chromium is shared by every handle; each handle only gets its own BrowserContext.
+# It is only started once a handle actually needs the browser fallback.
+_BROWSER = None
+_BROWSER_LOCK = None
+_CONTEXT_COUNTER = 0
+
+async def _get_browser(p):
+    """Return the shared browser, launching (or connecting to) it on first use."""
+    global _BROWSER, _BROWSER_LOCK, _CONTEXT_COUNTER
+    if _BROWSER_LOCK is None:
+        _BROWSER_LOCK = asyncio.Lock()
+    # Several handles can fall back at once; only one of them should launch the browser
+    async with _BROWSER_LOCK:
+        if _BROWSER is not None and not _BROWSER.is_connected():
+            logging.error("Lost connection to the browser; reconnecting.")
+            _BROWSER = None
+        if _BROWSER is None:
+            if BROWSER_CDP_URL:
+                # The external browser is shared with other clients; each handle still gets its own context
+                _BROWSER = await p.chromium.connect_over_cdp(BROWSER_CDP_URL)
+            else:
+                _BROWSER = await p.chromium.launch(headless=True)
+            _CONTEXT_COUNTER = 0
+        return _BROWSER
+
+async def _recycle_browser():
+    """
+    Close the browser once it has served BROWSER_RECYCLE_AFTER contexts; the next fallback relaunches it.
+    Only called between cycles, so no contexts are open when the browser is recycled.
+    """
+    if _BROWSER is not None and not BROWSER_CDP_URL and _CONTEXT_COUNTER >= BROWSER_RECYCLE_AFTER:
+        logging.info("Recycling browser after %s contexts.", _CONTEXT_COUNTER)
+        await _close_browser()
+
+async def _close_browser():
+    global _BROWSER
+    if _BROWSER is not None:
+        try:
+            await _BROWSER.close()
+        except Exception as e:
+            logging.error("Error closing browser: %s", e)
+        _BROWSER = None
+
+# --- X API functions ---
+X_GRAPHQL_FEATURES = {
+    "hidden_profile_likes_enabled": False,
+    "hidden_profile_subscriptions_enabled": False,
+    "responsive_web_graphql_exclude_directive_enabled": True,
+    "verified_phone_label_enabled": False,
+    "subscriptions_verification_info_is_identity_verified_enabled": False,
+    "subscriptions_verification_info_verified_since_enabled": True,
+    "highlights_tweets_tab_ui_enabled": True,
+    "creator_subscriptions_tweet_preview_api_enabled": True,
+    "responsive_web_graphql_skip_user_profile_image_extensions_enabled": False,
+    "responsive_web_graphql_timeline_navigation_enabled": True,
+    "rweb_lists_timeline_redesign_enabled": True,
+    "tweetypie_unmention_optimization_enabled": True,
+    "responsive_web_edit_tweet_api_enabled": True,
+    "graphql_is_translatable_rweb_tweet_is_translatable_enabled": True,
+    "view_counts_everywhere_api_enabled": True,
+    "longform_notetweets_consumption_enabled": True,
+    "tweet_awards_web_tipping_enabled": False,
+    "freedom_of_speech_not_reach_fetch_enabled": True,
+    "standardized_nudges_misinfo": True,
+    "tweet_with_visibility_results_prefer_gql_limited_actions_policy_enabled": False,
+    "longform_notetweets_rich_text_read_enabled": True,
+    "longform_notetweets_inline_media_enabled": False,
+    "responsive_web_enhance_cards_enabled": False,
+}
+
+# One pooled HTTP/2 client and guest token for the whole process
+_HTTP_CLIENT = None
+_GUEST_TOKEN = None
+_GUEST_TOKEN_LOCK = None
+# monotonic time before which every handle skips straight to the browser
+_X_API_RETRY_AT = 0.0
+
+def _x_api_paused():
+    return time.monotonic() < _X_API_RETRY_AT
+
+def _pause_x_api(reason):
+    global _X_API_RETRY_AT
+    if not _x_api_paused():
+        logging.warning("Pausing the X API for %s seconds (%s); using the browser meanwhile.",
+                        X_API_COOLDOWN_SECONDS, reason)
+    _X_API_RETRY_AT = time.monotonic() + X_API_COOLDOWN_SECONDS
+
+def _get_http_client():
+    global _HTTP_CLIENT, _GUEST_TOKEN_LOCK
+    if _HTTP_CLIENT is None:
+        _HTTP_CLIENT = httpx.AsyncClient(
+            http2=True,
+            timeout=20,
+            headers={"Authorization": f"Bearer {X_BEARER_TOKEN}"}
+        )
+        _GUEST_TOKEN_LOCK = asyncio.Lock()
+    return _HTTP_CLIENT
+
+async def _close_http_client():
+    global _HTTP_CLIENT, _GUEST_TOKEN
+    if _HTTP_CLIENT is not None:
+        await _HTTP_CLIENT.aclose()
+        _HTTP_CLIENT = None
+        _GUEST_TOKEN = None
+
+async def _get_guest_token(client):
+    """Activate a guest token once and share it between all handles."""
+    global _GUEST_TOKEN
+    async with _GUEST_TOKEN_LOCK:
+        # Another handle may have failed to activate one while this one waited for the lock
+        if _x_api_paused():
+            raise RuntimeError("X API paused")
+        if _GUEST_TOKEN is None:
+            try:
+                r = await client.post("https://api.twitter.com/1.1/guest/activate.json")
+                r.raise_for_status()
+                _GUEST_TOKEN = r.json()["guest_token"]
+            except Exception:
+                _pause_x_api("guest token activation failed")
+                raise
+        return _GUEST_TOKEN
+
+async def _graphql_get(client, query_id, operation, variables):
+    global _GUEST_TOKEN
+    guest_token = await _get_guest_token(client)
+    r = await client.get(
+        f"https://api.x.com/graphql/{query_id}/{operation}",
+        params={
+            "variables": json.dumps(variables),
+            "features": json.dumps(X_GRAPHQL_FEATURES)
+        },
+        headers={"x-guest-token": guest_token}
+    )
+    if r.status_code in (401, 403, 429):
+        # Guest token expired or rate limited; activate a new one on the next call,
+        # unless another handle has already replaced it
+        if _GUEST_TOKEN == guest_token:
+            _GUEST_TOKEN = None
+        if r.status_code == 429:
+            _pause_x_api("rate limited")
+    r.raise_for_status()
+    return r.json()
+
+def _parse_user_tweets(data):
+    """Yield the tweet result objects from a UserTweets timeline response."""
+    timeline = data["data"]["user"]["result"]["timeline_v2"]["timeline"]
+    for instruction in timeline.get("instructions", []):
+        if instruction.get("type") == "TimelinePinEntry":
+            entries = [instruction["entry"]]
+        else:
+            entries = instruction.get("entries", [])
+        for entry in entries:
+            result = (entry.get("content", {}).get("itemContent", {})
+                      .get("tweet_results", {}).get("result"))
+            result = _unwrap_tweet(result)
+            if result and "legacy" in result:
+                yield result
+
+def _unwrap_tweet(result):
+    if result and result.get("__typename") == "TweetWithVisibilityResults":
+        return result["tweet"]
+    return result
+
+def _tweet_link(tweet):
+    """Build the link the profile page renders for a tweet, using its author's screen name as X cases it."""
+    screen_name = tweet["core"]["user_results"]["result"]["legacy"]["screen_name"]
+    return f"https://x.com/{screen_name}/status/{tweet['rest_id']}"
+
+async def fetch_tweets_api(handle):
+    """
+    Fetch recent tweets and follower count for a handle via X's GraphQL API.
+    Returns (tweets_data, follower_count) or None if the API could not be used.
+    """
+    if _x_api_paused():
+        return None
+    client = _get_http_client()
+    try:
+        user = await _graphql_get(client, X_USER_BY_SCREEN_NAME_QUERY_ID, "UserByScreenName", {
+            "screen_name": handle,
+            "withSafetyModeUserFields": True
+        })
+        user_result = user["data"]["user"]["result"]
+        rest_id = user_result["rest_id"]
+        follower_count = f"{user_result['legacy']['followers_count']:,} Followers"
+
+        timeline = await _graphql_get(client, X_USER_TWEETS_QUERY_ID, "UserTweets", {
+            "userId": rest_id,
+            "count": 20,
+            "includePromotedContent": False,
+            "withQuickPromoteEligibilityTweetFields": False,
+            "withVoice": False,
+            "withV2Timeline": True
+        })
+        # Resolve the timeline here too, so an unexpected response shape also falls back to the browser
+        tweets = list(_parse_user_tweets(timeline))
+    except Exception as e:
+        # Guest access is refused often enough that this is routine, not an error
+        logging.info("X API unavailable for @%s, using the browser: %s", handle, e)
+        return None
+
+    cutoff = datetime.now(timezone.utc) - TWEET_TIME_THRESHOLD
+    tweets_data = []
+    for tweet in tweets:
+        try:
+            # A repost's article shows the original tweet, so alert on (and dedup by) that
+            retweeted = _unwrap_tweet(tweet["legacy"].get("retweeted_status_result", {}).get("result"))
+            if retweeted:
+                tweet = retweeted
+            tweet_time = datetime.strptime(tweet["legacy"]["created_at"], "%a %b %d %H:%M:%S %z %Y")
+            if tweet_time < cutoff:
+                continue
+            tweets_data.append({
+                "time": tweet_time,
+                # full_text is entity-escaped (&amp;, &gt;); match the page's innerText
+                "text": html.unescape(tweet["legacy"]["full_text"]),
+                "link": _tweet_link(tweet)
+            })
+        except Exception as e:
+            logging.error("Error extracting tweet data for @%s: %s", handle, e)
+    return tweets_data, follower_count
 
 # --- Scraping functions ---
-def process_handle(handle):
+# Only the tweet text, time and link are scraped; skip downloading everything else
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "stylesheet"}
+
+# Pull time, text and link for every article in one round-trip instead of several per article
+EXTRACT_TWEETS_JS = """
+() => Array.from(document.querySelectorAll('article')).map(a => {
+    const t = a.querySelector('time');
+    const l = a.querySelector("a[href*='/status/']");
+    return {
+        time: t && t.getAttribute('datetime'),
+        text: a.innerText,
+        link: l && l.getAttribute('href')
+    };
+})
+"""
+
+async def _block_heavy_resources(route):
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+async def scrape_tweets_browser(p, handle):
     """
-    Process a single handle:
-      - Launch Playwright
-      - Scrape tweets and follower count using locator-based functions
-      - Send a Telegram alert for tweets containing crypto keywords (if not already alerted)
+    Scrape recent tweets and follower count for a handle in a fresh browser context.
+    Returns (tweets_data, follower_count) or None if the page did not load.
     """
+    global _CONTEXT_COUNTER
+    browser = await _get_browser(p)
+    _CONTEXT_COUNTER += 1
+    context = await browser.new_context(viewport={"width": 800, "height": 600})
     try:
-        logging.info(f"Processing account: @{handle}")
-        
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context()
-            page = context.new_page()
+        await context.route("**/*", _block_heavy_resources)
+        page = await context.new_page()
 
-            profile_url = f"https://x.com/{handle}"
-            page.goto(profile_url, timeout=60000)
+        profile_url = f"https://x.com/{handle}"
+        # Don't wait for every asset to finish; only the tweet articles matter
+        await page.goto(profile_url, timeout=60000, wait_until="domcontentloaded")
 
-            articles_locator = page.locator("article")
-            try:
-                articles_locator.first.wait_for(timeout=50000)
-            except PlaywrightTimeoutError:
-                logging.error(f"Timeout waiting for articles on @{handle}'s page.")
-                context.close()
-                browser.close()
-                return
+        try:
+            await page.wait_for_selector("article[data-testid='tweet'], article", timeout=20000)
+        except PlaywrightTimeoutError:
+            logging.error("Timeout waiting for articles on @%s's page.", handle)
+            return None
 
-            # Scrape tweets
-            tweets_data = []
-            articles_count = articles_locator.count()
-            for i in range(articles_count):
-                article = articles_locator.nth(i)
-                try:
-                    time_locator = article.locator("time")
-                    tweet_time = None
-                    if time_locator.count() > 0:
-                        tweet_time_str = time_locator.first.get_attribute("datetime")
-                        tweet_time = datetime.fromisoformat(tweet_time_str.replace("Z", "+00:00"))
-                    
-                    if tweet_time is None or (datetime.now(tweet_time.tzinfo) - tweet_time) > TWEET_TIME_THRESHOLD:
-                        continue
-
-                    tweet_text = article.inner_text()
-
-                    link_locator = article.locator("a[href*='/status/']")
-                    if link_locator.count() > 0:
-                        tweet_link = link_locator.first.get_attribute("href")
-                        if tweet_link.startswith("/"):
-                            tweet_link = "https://x.com" + tweet_link
-                    else:
-                        tweet_link = profile_url
-
-                    tweets_data.append({
-                        "time": tweet_time,
-                        "text": tweet_text,
-                        "link": tweet_link
-                    })
-                except Exception as e:
-                    logging.error(f"Error extracting tweet data for @{handle}: {e}")
-
-            page.goto(profile_url, timeout=60000)
-            followers_locator = page.locator("a", has_text="Followers")
+        # Scrape tweets
+        cutoff = datetime.now(timezone.utc) - TWEET_TIME_THRESHOLD
+        tweets_data = []
+        for article in await page.evaluate(EXTRACT_TWEETS_JS):
             try:
-                followers_locator.first.wait_for(timeout=50000)
-            except PlaywrightTimeoutError:
-                logging.error(f"Timeout waiting for followers link on @{handle}'s page.")
-                context.close()
-                browser.close()
-                return
+                if not article["time"]:
+                    continue
+                tweet_time = datetime.fromisoformat(article["time"].replace("Z", "+00:00"))
+                if tweet_time < cutoff:
+                    continue
 
-            follower_count = (followers_locator.first.inner_text().strip()
-                              if followers_locator.count() > 0 else "N/A")
+                tweet_link = article["link"]
+                if tweet_link:
+                    if tweet_link.startswith("/"):
+                        tweet_link = "https://x.com" + tweet_link
+                else:
+                    tweet_link = profile_url
 
-            context.close()
-            browser.close()
+                tweets_data.append({
+                    "time": tweet_time,
+                    "text": article["text"],
+                    "link": tweet_link
+                })
+            except Exception as e:
+                logging.error("Error extracting tweet data for @%s: %s", handle, e)
 
-            for tweet in tweets_data:
-                if already_alerted(handle, tweet["link"]):
-                    logging.info(f"Skipping already alerted tweet for @{handle}: {tweet['link']}")
-                    continue
-                if any(keyword in tweet["text"].lower() for keyword in CRYPTO_KEYWORDS):
-                    message = (
-                        f"*User:* @{handle}\n"
-                        f"*Followers:* {follower_count}\n\n"
-                        f"*Tweet:*\n{tweet['text']}\n\n"
-                        f"[View Tweet]({tweet['link']})"
-                    )
-                    send_telegram_alert(message)
-                    add_alerted(handle, tweet["link"])
+        # The followers link is already on the loaded profile page; no need to navigate again
+        followers_locator = page.locator("a[href$='/verified_followers'], a[href$='/followers']")
+        follower_count = "N/A"
+        try:
+            await followers_locator.first.wait_for(timeout=10000)
+            follower_count = (await followers_locator.first.inner_text()).strip()
+        except PlaywrightTimeoutError:
+            # Still alert on the tweets, just without a follower count
+            logging.error("Timeout waiting for followers link on @%s's page.", handle)
+        return tweets_data, follower_count
+    finally:
+        await context.close()
+
+async def process_handle(p, sem, handle):
+    """
+    Process a single handle (at most NUM_THREADS at once):
+      - Fetch tweets and follower count from the X API, falling back to the browser
+      - Send a Telegram alert for tweets containing crypto keywords (if not already alerted)
+    """
+    try:
+        async with sem:
+            logging.info("Processing account: @%s", handle)
+            scraped = await fetch_tweets_api(handle) if X_API_ENABLED else None
+            if scraped is None:
+                scraped = await scrape_tweets_browser(p, handle)
+            if scraped is None:
+                return
+            tweets_data, follower_count = scraped
+
+        seen = {link.lower() for link in already_alerted(handle, (tweet["link"] for tweet in tweets_data))}
+        pending_alerts = []
+        for tweet in tweets_data:
+            if tweet["link"].lower() in seen:
+                logging.info("Skipping already alerted tweet for @%s: %s", handle, tweet["link"])
+                continue
+            if CRYPTO_KEYWORDS_RE.search(tweet["text"]):
+                # HTML rather than Markdown, so underscores, asterisks and brackets in handles and tweets are safe
+                message = (
+                    f"<b>User:</b> @{html.escape(handle)}\n"
+                    f"<b>Followers:</b> {html.escape(follower_count)}\n\n"
+                    f"<b>Tweet:</b>\n{html.escape(tweet['text'])}\n\n"
+                    f"<a href=\"{html.escape(tweet['link'])}\">View Tweet</a>"
+                )
+                pending_alerts.append((tweet["link"], message))
+                # The same link can appear twice in one scrape (pinned/reposted tweets, profile_url fallbacks)
+                seen.add(tweet["link"].lower())
+
+        # Send in tweet order; alerts that hit a temporary failure are left unrecorded and retried next cycle
+        done = []
+        try:
+            for link, message in pending_alerts:
+                if await send_telegram_alert(message):
+                    done.append(link)
+        finally:
+            if done:
+                add_alerted(handle, done)
     except Exception as e:
-        logging.error(f"Error processing @{handle}: {e}")
+        logging.error("Error processing @%s: %s", handle, e)
+
+def setup_logging():
+    """Log through a queue so the actual stream writes happen on a background thread."""
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+    return listener
 
-def main():
-    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+async def main():
     init_db()
-    handles = load_handles(USERS_FILE)
+    handles = current_handles()
     if not handles:
         logging.error("No handles loaded. Exiting.")
         return
 
-    logging.info(f"Loaded {len(handles)} handles from {USERS_FILE}")
-    while True:
-        current_handles = load_handles(USERS_FILE)
-        logging.info(f"Starting processing cycle for {len(current_handles)} handles with {NUM_THREADS} processes.")
-        with concurrent.futures.ProcessPoolExecutor(max_workers=NUM_THREADS) as executor:
-            futures = [executor.submit(process_handle, handle) for handle in current_handles]
-            concurrent.futures.wait(futures)
-        logging.info(f"Cycle complete. Sleeping for {CHECK_INTERVAL_SECONDS} seconds...")
-        time.sleep(CHECK_INTERVAL_SECONDS)
+    logging.info("Loaded %s handles from %s", len(handles), USERS_FILE)
+    sem = asyncio.Semaphore(NUM_THREADS)
+    async with async_playwright() as p:
+        try:
+            while True:
+                handles = current_handles()
+                if not handles:
+                    # Nothing to await otherwise, so the loop would spin at full speed
+                    retry_seconds = max(CHECK_INTERVAL_SECONDS, EMPTY_USERS_RETRY_SECONDS)
+                    logging.warning("No handles loaded. Checking %s again in %s seconds.", USERS_FILE, retry_seconds)
+                    await asyncio.sleep(retry_seconds)
+                    continue
+                logging.info("Starting processing cycle for %s handles with %s concurrent pages.", len(handles), NUM_THREADS)
+                tasks = [asyncio.create_task(process_handle(p, sem, handle)) for handle in handles]
+                # Each handle sends its own alerts as soon as it finishes; just surface anything unexpected
+                for task in asyncio.as_completed(tasks):
+                    try:
+                        await task
+                    except Exception as e:
+                        logging.error("Unhandled error in handle task: %s", e)
+                await _recycle_browser()
+                optimize_db()
+                if CHECK_INTERVAL_SECONDS:
+                    # Use the idle time for housekeeping before sleeping
+                    checkpoint_db()
+                    logging.info("Cycle complete. Sleeping for %s seconds...", CHECK_INTERVAL_SECONDS)
+                    await asyncio.sleep(CHECK_INTERVAL_SECONDS)
+                else:
+                    logging.info("Cycle complete.")
+        finally:
+            await _close_browser()
+            await _close_http_client()
+            await _close_tg_client()
+            close_db()
 
 if __name__ == "__main__":
-    main()
+    listener = setup_logging()
+    try:
+        asyncio.run(main())
+    finally:
+        listener.stop()